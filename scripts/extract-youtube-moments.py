@@ -5,9 +5,11 @@ Loads credentials from .dev.vars, uses boto3 for R2
 """
 
 import boto3
+from botocore.exceptions import ClientError
 import json
 import sys
 import os
+import time
 import requests
 from pathlib import Path
 from datetime import datetime
@@ -62,6 +64,10 @@ BUCKET = 'capless-preview'
 PREFIX_TRANSCRIPTS = 'youtube/transcripts/'
 PREFIX_MOMENTS = 'moment-extraction/'
 
+# Output budget for one moment set; gpt-5-mini also spends reasoning tokens
+# from this allowance, so leave headroom above the ~2-3K tokens of JSON
+MAX_COMPLETION_TOKENS = 8192
+
 def list_youtube_transcripts():
     """List all YouTube transcripts in R2"""
     print("📋 Listing YouTube transcripts from R2...", file=sys.stderr)
@@ -100,6 +106,31 @@ def list_youtube_transcripts():
     print(f"✅ Found {len(transcripts)} YouTube transcripts", file=sys.stderr)
     return transcripts
 
+def read_streamed_completion(response):
+    """Accumulate the content deltas of a streamed chat completion.
+
+    Returns (content, finish_reason).
+    """
+    parts = []
+    finish_reason = None
+
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data: '):
+            continue
+        data = line[len('data: '):]
+        if data == '[DONE]':
+            break
+
+        chunk = json.loads(data)
+        for choice in chunk.get('choices', []):
+            delta = choice.get('delta') or {}
+            if delta.get('content'):
+                parts.append(delta['content'])
+            if choice.get('finish_reason'):
+                finish_reason = choice['finish_reason']
+
+    return ''.join(parts), finish_reason
+
 def check_already_processed(date):
     """Check if moment extraction already exists for this date"""
     try:
@@ -162,7 +193,7 @@ Return JSON with:
 Transcript:
 """ + transcript_text
 
-    # Call OpenAI API
+    # Call OpenAI API (streamed, so a stalled generation shows up early)
     try:
         response = requests.post(
             'https://api.openai.com/v1/chat/completions',
@@ -176,8 +207,11 @@ Transcript:
                     {'role': 'system', 'content': 'You are an expert TikTok content curator for Singaporean political content. Return only valid JSON, no markdown.'},
                     {'role': 'user', 'content': prompt}
                 ],
-                'response_format': {'type': 'json_object'}
+                'response_format': {'type': 'json_object'},
+                'max_completion_tokens': MAX_COMPLETION_TOKENS,
+                'stream': True
             },
+            stream=True,
             timeout=120
         )
 
@@ -185,8 +219,12 @@ Transcript:
             print(f"  ❌ OpenAI API error: {response.status_code} {response.text[:200]}", file=sys.stderr)
             return False
 
-        result = response.json()
-        moments = json.loads(result['choices'][0]['message']['content'])
+        content, finish_reason = read_streamed_completion(response)
+        if finish_reason == 'length':
+            print(f"  ❌ Response truncated at {MAX_COMPLETION_TOKENS} completion tokens", file=sys.stderr)
+            return False
+
+        moments = json.loads(content)
 
     except Exception as e:
         print(f"  ❌ API call failed: {e}", file=sys.stderr)
@@ -200,15 +238,21 @@ Transcript:
         'moments': moments.get('moments', [])
     }
 
-    # Upload to R2
+    # Upload to R2 (write-once: another run may have uploaded this date already)
     try:
         s3.put_object(
             Bucket=BUCKET,
             Key=f'{PREFIX_MOMENTS}youtube-{date}.json',
             Body=json.dumps(output),
-            ContentType='application/json'
+            ContentType='application/json',
+            IfNoneMatch='*'
         )
         print(f"  ✅ Uploaded to R2", file=sys.stderr)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'PreconditionFailed':
+            print(f"  ❌ Failed to upload: {e}", file=sys.stderr)
+            return False
+        print(f"  ⏭️  Already uploaded by another run, keeping existing object", file=sys.stderr)
     except Exception as e:
         print(f"  ❌ Failed to upload: {e}", file=sys.stderr)
         return False
@@ -243,7 +287,6 @@ def main():
             processed += 1
 
         # Rate limiting delay (gpt-5-mini: 3 RPM limit)
-        import time
         time.sleep(25)  # 25 seconds = 2.4 RPM (under 3 RPM limit)
 
     print("", file=sys.stderr)
@@ -2,14 +2,24 @@
 """
 Match YouTube VTT timestamps with Hansard moments
 """
+import hashlib
 import json
+import os
 import re
+import shelve
 from datetime import time, timedelta
+from functools import lru_cache
 
+MATCH_CACHE_PATH = '.cache/quote_matches.db'
+
+_TS_RE = re.compile(r'(\d\d):(\d\d):(\d\d)\.(\d\d\d)')
+
+@lru_cache(maxsize=8192)
 def parse_vtt_timestamp(ts_str):
     """Convert VTT timestamp to seconds: '00:30:05.279' -> 1805.279"""
-    h, m, s = ts_str.split(':')
-    return int(h) * 3600 + int(m) * 60 + float(s)
+    h, m, s, ms = map(int, _TS_RE.match(ts_str).groups())
+    # Sum in integer milliseconds so only one float division happens
+    return ((h * 3600 + m * 60 + s) * 1000 + ms) / 1000
 
 def parse_vtt(vtt_path):
     """Parse VTT file and return list of (start_sec, end_sec, text)"""
@@ -37,13 +47,24 @@ def parse_vtt(vtt_path):
     
     return segments
 
-def find_quote_in_transcript(quote, transcript_segments, window=120):
+def find_quote_in_transcript(quote, transcript_segments, window=120, video_id=None, cache=None):
     """
     Find the best matching segment for a quote
     Returns (start_seconds, confidence_score)
+
+    If a cache (e.g. a shelve) and video_id are given, previous results for the
+    same normalized quote are reused instead of rescanning the transcript.
     """
     # Normalize quote for matching
     quote_clean = ' '.join(quote.lower().split())
+
+    cache_key = None
+    if cache is not None and video_id:
+        cache_key = f"{video_id}:{hashlib.sha1(quote_clean.encode()).hexdigest()}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     quote_words = set(quote_clean.split())
     
     best_match = None
@@ -67,6 +88,9 @@ def find_quote_in_transcript(quote, transcript_segments, window=120):
             best_score = score
             best_match = seg['start_seconds']
     
+    if cache_key is not None:
+        cache[cache_key] = (best_match, best_score)
+    
     return best_match, best_score
 
 def main():
@@ -88,34 +112,39 @@ def main():
     # Match each moment with YouTube timestamp
     print("\nMatching moments with YouTube timestamps...")
     enhanced_moments = []
+    video_id = 'n9ZyN-lwiXg'
     
-    for i, moment in enumerate(moments, 1):
-        quote = moment.get('quote', '')
-        print(f"\n[{i}/{len(moments)}] Matching: {quote[:60]}...")
+    os.makedirs(os.path.dirname(MATCH_CACHE_PATH), exist_ok=True)
+    with shelve.open(MATCH_CACHE_PATH) as cache:
+        for i, moment in enumerate(moments, 1):
+            quote = moment.get('quote', '')
+            print(f"\n[{i}/{len(moments)}] Matching: {quote[:60]}...")
         
-        start_sec, confidence = find_quote_in_transcript(quote, transcript_segments)
+            start_sec, confidence = find_quote_in_transcript(
+                quote, transcript_segments, video_id=video_id, cache=cache
+            )
         
-        if start_sec:
-            print(f"  ✅ Found at {int(start_sec//60)}:{int(start_sec%60):02d} (confidence: {confidence:.1%})")
-            moment['youtube_start_seconds'] = int(start_sec)
-            moment['youtube_timestamp'] = f"{int(start_sec//60)}:{int(start_sec%60):02d}"
-            moment['youtube_url'] = f"https://www.youtube.com/watch?v=n9ZyN-lwiXg&t={int(start_sec)}s"
-            moment['timestamp_confidence'] = round(confidence, 3)
-        else:
-            print(f"  ⚠️  No match found")
-            moment['youtube_start_seconds'] = None
-            moment['youtube_timestamp'] = None
-            moment['youtube_url'] = None
-            moment['timestamp_confidence'] = 0
+            if start_sec:
+                print(f"  ✅ Found at {int(start_sec//60)}:{int(start_sec%60):02d} (confidence: {confidence:.1%})")
+                moment['youtube_start_seconds'] = int(start_sec)
+                moment['youtube_timestamp'] = f"{int(start_sec//60)}:{int(start_sec%60):02d}"
+                moment['youtube_url'] = f"https://www.youtube.com/watch?v={video_id}&t={int(start_sec)}s"
+                moment['timestamp_confidence'] = round(confidence, 3)
+            else:
+                print(f"  ⚠️  No match found")
+                moment['youtube_start_seconds'] = None
+                moment['youtube_timestamp'] = None
+                moment['youtube_url'] = None
+                moment['timestamp_confidence'] = 0
         
-        enhanced_moments.append(moment)
+            enhanced_moments.append(moment)
     
     # Save enhanced moments
     output_path = 'test-outputs/22-09-2024/moments-with-youtube-timestamps.json'
     output_data = {
         **moments_data,
         'moments': enhanced_moments,
-        'youtube_video_id': 'n9ZyN-lwiXg',
+        'youtube_video_id': video_id,
         'youtube_mapping_complete': True
     }
     
@@ -3,13 +3,38 @@
 Test section-based chunking on sample sessions to validate approach
 """
 
+import bisect
 import boto3
+import functools
+from boto3.s3.transfer import TransferConfig
+import io
+import itertools
+import os
 import json
 import sys
 import re
+import threading
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # optional C-accelerated parser; fall back to regex
+    HTMLParser = None
+
+try:
+    import orjson
+except ImportError:  # optional faster JSON parser; fall back to stdlib json
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional streaming JSON parser; fall back to a full load
+    ijson = None
+
+@functools.lru_cache(maxsize=1)
 def load_credentials():
     """Load credentials from .dev.vars"""
     project_root = Path(__file__).parent.parent
@@ -25,63 +50,166 @@ def load_credentials():
 
     return credentials
 
-creds = load_credentials()
-s3 = boto3.client(
-    's3',
-    endpoint_url=f'https://{creds["CLOUDFLARE_ACCOUNT_ID"]}.r2.cloudflarestorage.com',
-    aws_access_key_id=creds['R2_ACCESS_KEY_ID'],
-    aws_secret_access_key=creds['R2_SECRET_ACCESS_KEY'],
-    region_name='auto'
+@functools.lru_cache(maxsize=1)
+def get_s3():
+    """Create the shared R2 client on first use"""
+    creds = load_credentials()
+    return boto3.client(
+        's3',
+        endpoint_url=f'https://{creds["CLOUDFLARE_ACCOUNT_ID"]}.r2.cloudflarestorage.com',
+        aws_access_key_id=creds['R2_ACCESS_KEY_ID'],
+        aws_secret_access_key=creds['R2_SECRET_ACCESS_KEY'],
+        region_name='auto',
+        config=Config(
+            max_pool_connections=50,
+            retries={'mode': 'adaptive', 'max_attempts': 3},
+            tcp_keepalive=True
+        )
+    )
+
+# Large VTTs are fetched as parallel ranged GETs
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
 )
 
 BUCKET = 'capless-preview'
+CACHE_DIR = Path('/tmp/capless-cache')
+
+_TAG_RE = re.compile('<[^<]+?>')
+
+# "HH:MM:SS.mmm --> HH:MM:SS.mmm" cue timing lines
+_VTT_TIMING_RE = re.compile(r'(\d\d:\d\d:\d\d\.\d{3})\s+-->\s+(\d\d:\d\d:\d\d\.\d{3})')
+
+# Caption text lines: non-blank and not the header, a cue number or a timing line
+_VTT_TEXT_RE = re.compile(
+    r'^[ \t]*(?!WEBVTT)(?!\d+[ \t\r]*$)(?![^\n]*-->)(\S[^\n]*?)[ \t\r]*$',
+    re.MULTILINE
+)
+
+def fetch_object(key):
+    """Fetch an R2 object's bytes, reusing the local copy if its ETag is unchanged"""
+    etag = get_s3().head_object(Bucket=BUCKET, Key=key)['ETag'].strip('"')
+    cache_path = CACHE_DIR / f'{etag}.bin'
+
+    if cache_path.exists():
+        return cache_path.read_bytes()
+
+    buf = io.BytesIO()
+    get_s3().download_fileobj(BUCKET, key, buf, Config=TRANSFER_CONFIG)
+    data = buf.getvalue()
+
+    # Write then rename so an interrupted run never leaves a partial cache entry;
+    # fetches run on threads, so the temp name is per thread as well as per process
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, cache_path)
+
+    return data
+
+def load_json(raw):
+    """Parse JSON bytes, using orjson when installed"""
+    if orjson is None:
+        return json.loads(raw)
+    return orjson.loads(raw)
+
+def load_hansard_sections(raw):
+    """Return (format, iterator over takesSectionVOList sections).
+
+    With ijson the sections are parsed one at a time, so only the current
+    section is materialized rather than the whole document tree.
+    """
+    if ijson is None:
+        data = load_json(raw)
+        return data.get('format', 'unknown'), iter(data.get('takesSectionVOList', []))
+
+    session_format = next(ijson.items(io.BytesIO(raw), 'format'), 'unknown')
+    sections = ijson.items(io.BytesIO(raw), 'takesSectionVOList.item')
+
+    return session_format, sections
 
 def strip_html(html_text):
     """Strip HTML tags from text"""
-    # Remove HTML tags
-    clean = re.sub('<[^<]+?>', '', html_text)
-    # Remove extra whitespace
-    clean = re.sub(r'\s+', ' ', clean)
-    return clean.strip()
-
-def test_recent_hansard(date):
+    if HTMLParser is not None:
+        try:
+            return ' '.join(HTMLParser(html_text).text(separator=' ').split())
+        except Exception:
+            pass
+
+    # Remove HTML tags, then collapse whitespace (str.split avoids a second regex pass)
+    return ' '.join(_TAG_RE.sub('', html_text).split())
+
+def plan_section_chunks(sizes, chunk_limit=180000, section_limit=200000):
+    """Greedily pack consecutive sections into chunks of at most chunk_limit chars.
+
+    Sections over section_limit get a chunk of their own. Returns a list of
+    (chunk_type, section_numbers, size) with 1-based section numbers. Chunk
+    ends are found by bisecting prefix sums, so the cost scales with the
+    number of chunks rather than the number of sections.
+    """
+    cum = [0, *itertools.accumulate(sizes)]
+    large = [i for i, size in enumerate(sizes) if size > section_limit]
+
+    chunks = []
+    start = 0
+    for stop in large + [len(sizes)]:
+        # Pack sections[start:stop], which are all within section_limit
+        while start < stop:
+            end = bisect.bisect_right(cum, cum[start] + chunk_limit, start, stop + 1) - 1
+            end = max(end, start + 1)  # an oversized section still forms its own chunk
+            chunks.append(('combined', list(range(start + 1, end + 1)), cum[end] - cum[start]))
+            start = end
+
+        if stop < len(sizes):
+            chunks.append(('large', [stop + 1], sizes[stop]))
+            start = stop + 1
+
+    return chunks
+
+def fetch_recent_hansard(date):
+    """Download recent Hansard JSON"""
+    return fetch_object(f'hansard/cleaned/{date}.json')
+
+def analyze_recent_hansard(raw, date):
     """Test section-based chunking on recent Hansard"""
     print(f"\n{'='*80}")
     print(f"TEST 1: Recent Hansard (NEW_STRUCTURED_FORMAT) - {date}")
     print(f"{'='*80}\n")
 
-    key = f'hansard/cleaned/{date}.json'
-
     try:
-        local_path = f'/tmp/test_recent_{date}.json'
-        s3.download_file(BUCKET, key, local_path)
+        session_format, sections = load_hansard_sections(raw)
 
-        with open(local_path, 'r') as f:
-            data = json.load(f)
-
-        sections = data.get('takesSectionVOList', [])
+        # Strip each section once; both the analysis and chunking loops reuse it
+        parsed = []
+        for i, section in enumerate(sections, 1):
+            content_html = section.get('content', '')
+            parsed.append((
+                i,
+                section.get('title', 'N/A')[:60],
+                section.get('sectionType', 'N/A'),
+                len(content_html),
+                strip_html(content_html)
+            ))
 
         print(f"📊 Session Analysis:")
-        print(f"   Total sections: {len(sections)}")
-        print(f"   Format: {data.get('format', 'unknown')}")
+        print(f"   Total sections: {len(parsed)}")
+        print(f"   Format: {session_format}")
         print()
 
         # Analyze sections
         total_text_length = 0
         sections_over_200k = []
 
-        for i, section in enumerate(sections, 1):
-            content_html = section.get('content', '')
-            content_text = strip_html(content_html)
+        for i, title, section_type, html_len, content_text in parsed:
             text_len = len(content_text)
             total_text_length += text_len
 
-            title = section.get('title', 'N/A')[:60]
-            section_type = section.get('sectionType', 'N/A')
-
             print(f"Section {i}: {title}")
             print(f"  Type: {section_type}")
-            print(f"  HTML: {len(content_html):,} chars")
+            print(f"  HTML: {html_len:,} chars")
             print(f"  Text: {text_len:,} chars")
 
             if text_len > 200000:
@@ -109,34 +237,7 @@ def test_recent_hansard(date):
             print(f"   ✅ Preserves complete conversations within each section")
 
             # Show how we'd chunk
-            chunks = []
-            current_chunk = []
-            current_size = 0
-
-            for i, section in enumerate(sections, 1):
-                content_text = strip_html(section.get('content', ''))
-                section_size = len(content_text)
-
-                if section_size > 200000:
-                    # Large section - extract separately
-                    if current_chunk:
-                        chunks.append(('combined', current_chunk, current_size))
-                        current_chunk = []
-                        current_size = 0
-                    chunks.append(('large', [i], section_size))
-                elif current_size + section_size > 180000:
-                    # Current chunk full - start new one
-                    if current_chunk:
-                        chunks.append(('combined', current_chunk, current_size))
-                    current_chunk = [i]
-                    current_size = section_size
-                else:
-                    # Add to current chunk
-                    current_chunk.append(i)
-                    current_size += section_size
-
-            if current_chunk:
-                chunks.append(('combined', current_chunk, current_size))
+            chunks = plan_section_chunks([len(text) for _, _, _, _, text in parsed])
 
             print(f"\n   📦 Proposed chunks: {len(chunks)}")
             for j, (chunk_type, section_nums, size) in enumerate(chunks, 1):
@@ -147,7 +248,7 @@ def test_recent_hansard(date):
 
         return {
             'date': date,
-            'total_sections': len(sections),
+            'total_sections': len(parsed),
             'total_chars': total_text_length,
             'needs_chunking': total_text_length > 200000,
             'large_sections': len(sections_over_200k)
@@ -157,20 +258,18 @@ def test_recent_hansard(date):
         print(f"❌ Error: {e}")
         return None
 
-def test_old_hansard(date):
+def fetch_old_hansard(date):
+    """Download old Hansard JSON"""
+    return fetch_object(f'hansard/cleaned/{date}.json')
+
+def analyze_old_hansard(raw, date):
     """Test old Hansard format"""
     print(f"\n{'='*80}")
     print(f"TEST 2: Old Hansard (OLD_HTML_FORMAT) - {date}")
     print(f"{'='*80}\n")
 
-    key = f'hansard/cleaned/{date}.json'
-
     try:
-        local_path = f'/tmp/test_old_{date}.json'
-        s3.download_file(BUCKET, key, local_path)
-
-        with open(local_path, 'r') as f:
-            data = json.load(f)
+        data = load_json(raw)
 
         cleaned = data.get('cleanedContent', {})
         full_text = cleaned.get('fullText', '')
@@ -212,60 +311,58 @@ def test_old_hansard(date):
         print(f"❌ Error: {e}")
         return None
 
-def test_youtube_vtt(date):
+def fetch_youtube_vtt(date):
+    """Download YouTube VTT"""
+    return fetch_object(f'youtube/transcripts/{date}.vtt')
+
+def analyze_youtube_vtt(raw, date):
     """Test YouTube VTT format"""
     print(f"\n{'='*80}")
     print(f"TEST 3: YouTube VTT - {date}")
     print(f"{'='*80}\n")
 
-    key = f'youtube/transcripts/{date}.vtt'
-
     try:
-        local_path = f'/tmp/test_youtube_{date}.vtt'
-        s3.download_file(BUCKET, key, local_path)
+        vtt_content = raw.decode('utf-8')
+        vtt_len = len(vtt_content)
 
-        with open(local_path, 'r') as f:
-            vtt_content = f.read()
+        # Cue timings and text lines are each found in one C-level regex scan
+        # rather than several string checks per line
+        timestamps = _VTT_TIMING_RE.findall(vtt_content)
+        timestamp_count = len(timestamps)
 
-        # Parse VTT
-        lines = vtt_content.split('\n')
-        timestamp_lines = [l for l in lines if '-->' in l]
+        text_chars = 0
+        text_line_count = 0
+        for match in _VTT_TEXT_RE.finditer(vtt_content):
+            text_chars += match.end(1) - match.start(1)
+            text_line_count += 1
 
-        # Extract text only (skip headers, timestamps)
-        text_lines = []
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('WEBVTT') and '-->' not in line and not line.isdigit():
-                text_lines.append(line)
-
-        text_only = '\n'.join(text_lines)
+        # Length of the text lines joined by newlines
+        text_len = text_chars + max(text_line_count - 1, 0)
 
         print(f"📊 VTT Analysis:")
-        print(f"   Total VTT length: {len(vtt_content):,} characters")
-        print(f"   Text-only length: {len(text_only):,} characters")
-        print(f"   Timestamp entries: {len(timestamp_lines):,}")
-        print(f"   Overhead: {100 * (len(vtt_content) - len(text_only)) / len(vtt_content):.1f}%")
+        print(f"   Total VTT length: {vtt_len:,} characters")
+        print(f"   Text-only length: {text_len:,} characters")
+        print(f"   Timestamp entries: {timestamp_count:,}")
+        print(f"   Overhead: {100 * (vtt_len - text_len) / vtt_len:.1f}%")
         print()
 
         # Estimate duration
-        if timestamp_lines:
-            last_timestamp = timestamp_lines[-1]
-            # Extract time from "HH:MM:SS.mmm --> HH:MM:SS.mmm"
-            end_time = last_timestamp.split('-->')[1].strip().split()[0]
+        if timestamps:
+            end_time = timestamps[-1][1]
             print(f"   Estimated duration: ~{end_time}")
         print()
 
         print(f"💡 Chunking Strategy:")
-        print(f"   ⚠️  VTT is {len(vtt_content):,} chars - MASSIVE (15x over limit!)")
+        print(f"   ⚠️  VTT is {vtt_len:,} chars - MASSIVE (15x over limit!)")
         print(f"   ✅ Will parse timestamps and chunk by time ranges")
-        print(f"   ✅ Suggested: 30-minute segments (~{len(timestamp_lines) // 6:,} timestamps per chunk)")
+        print(f"   ✅ Suggested: 30-minute segments (~{timestamp_count // 6:,} timestamps per chunk)")
         print(f"   ✅ Preserves timestamp alignment for moment extraction")
 
         return {
             'date': date,
-            'total_chars': len(vtt_content),
-            'text_chars': len(text_only),
-            'timestamps': len(timestamp_lines),
+            'total_chars': vtt_len,
+            'text_chars': text_len,
+            'timestamps': timestamp_count,
             'needs_chunking': True
         }
 
@@ -282,20 +379,36 @@ def main():
 
     results = []
 
-    # Test 1: Recent Hansard (should have sections)
-    result = test_recent_hansard('01-03-2024')
-    if result:
-        results.append(result)
-
-    # Test 2: Old Hansard (simple format)
-    result = test_old_hansard('01-03-1985')
-    if result:
-        results.append(result)
+    tests = [
+        # Test 1: Recent Hansard (should have sections)
+        ('01-03-2024', fetch_recent_hansard, analyze_recent_hansard),
+        # Test 2: Old Hansard (simple format)
+        ('01-03-1985', fetch_old_hansard, analyze_old_hansard),
+        # Test 3: YouTube VTT
+        ('2024-08-06', fetch_youtube_vtt, analyze_youtube_vtt),
+    ]
+
+    # Downloads are network-bound, so fetch all files concurrently and
+    # analyze each one as soon as it lands. The client is created up front
+    # because boto3 client construction is not thread-safe.
+    get_s3()
+    with ThreadPoolExecutor(max_workers=len(tests)) as pool:
+        futures = {
+            pool.submit(fetch, date): (date, analyze)
+            for date, fetch, analyze in tests
+        }
 
-    # Test 3: YouTube VTT
-    result = test_youtube_vtt('2024-08-06')
-    if result:
-        results.append(result)
+        for future in as_completed(futures):
+            date, analyze = futures[future]
+            try:
+                raw = future.result()
+            except Exception as e:
+                print(f"❌ Error downloading {date}: {e}")
+                continue
+
+            result = analyze(raw, date)
+            if result:
+                results.append(result)
 
     # Summary
     print(f"\n{'='*80}")
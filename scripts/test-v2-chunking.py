@@ -5,30 +5,31 @@ Test the v2 chunking logic without API calls
 
 import sys
 import math
+import bisect
+import operator
+import itertools
 from pathlib import Path
 
 # Add parent directory to path to import from extract script
 sys.path.insert(0, str(Path(__file__).parent))
 
+_MOCK = 'mock'
+
 # Mock VTT data for testing (11 hours worth)
 def generate_mock_captions(duration_hours=11):
     """Generate mock VTT captions for testing"""
-    captions = []
     total_seconds = int(duration_hours * 3600)
 
     # One caption every 3 seconds
-    for i in range(0, total_seconds, 3):
-        start = i
-        end = i + 2.5
-        text = f"Mock caption {i//3} at {i//3600}h {(i%3600)//60}m"
-
-        # Add occasional long pauses (speaker changes)
-        if i > 0 and i % 600 == 0:  # Every 10 minutes
-            start = i + 5  # 5 second pause
+    offsets = range(0, total_seconds, 3)
 
-        captions.append((start, end, text))
+    # Add occasional long pauses (speaker changes): every 10 minutes the
+    # caption starts 5 seconds late
+    starts = [i + 5 if i and i % 600 == 0 else i for i in offsets]
+    ends = [i + 2.5 for i in offsets]
 
-    return captions
+    # Chunking only looks at times, so every caption shares one placeholder text
+    return list(zip(starts, ends, itertools.repeat(_MOCK)))
 
 def format_timestamp(seconds):
     """Convert seconds to HH:MM:SS"""
@@ -37,68 +38,89 @@ def format_timestamp(seconds):
     secs = int(seconds % 60)
     return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
-def find_speaker_change(captions, target_time, window=120):
-    """Find nearest speaker change (simplified version)"""
+def find_speaker_change(ends, pauses, target_time, window=120):
+    """Find nearest speaker change (simplified version)
+
+    ends is the sorted list of caption end times, used to bisect straight to
+    the captions within the window instead of scanning every caption.
+    pauses[i] is the gap between caption i and caption i + 1.
+    """
     candidates = []
 
-    for i in range(len(captions) - 1):
-        start, end, text = captions[i]
-        next_start, next_end, next_text = captions[i + 1]
+    lo = bisect.bisect_left(ends, target_time - window)
+    hi = bisect.bisect_right(ends, target_time + window)
 
-        if abs(end - target_time) <= window:
-            pause = next_start - end
-            if pause > 3.0:
-                candidates.append((end, pause))
+    for i in range(lo, min(hi, len(pauses))):
+        if pauses[i] > 3.0:
+            candidates.append((ends[i], pauses[i]))
 
     if not candidates:
         return target_time
 
-    candidates.sort(key=lambda x: (abs(x[0] - target_time), -x[1]))
-    return candidates[0][0]
+    return min(candidates, key=lambda x: (abs(x[0] - target_time), -x[1]))[0]
 
-def chunk_with_overlap(captions, chunk_duration=9000, overlap_duration=1200):
-    """Chunk with overlap (from v2 script)"""
-    if not captions:
-        return []
+def _chunk_bounds(sorted_starts, ends, pauses, chunk_duration, overlap_duration, window=180):
+    """Numeric core of chunk_with_overlap
 
-    max_time = captions[-1][1]
-    chunks = []
-    chunk_id = 0
+    Yields (start_time, end_time, caption_count) for each non-empty chunk,
+    working only on the time columns. sorted_starts is the caption start
+    times in ascending order, which need not be caption order.
+    """
+    max_time = ends[-1]
 
     current_start = 0
     while current_start < max_time:
         target_end = current_start + chunk_duration
 
         if target_end < max_time:
-            actual_end = find_speaker_change(captions, target_end, window=180)
+            actual_end = find_speaker_change(ends, pauses, target_end, window=window)
         else:
             actual_end = max_time
 
-        chunk_captions = [(s, e, t) for s, e, t in captions
-                         if s >= current_start and s < actual_end]
-
-        if chunk_captions:
-            overlap_start = max(0, actual_end - overlap_duration) if actual_end < max_time else None
-
-            metadata = {
-                'chunk_id': f'chunk-{chunk_id:03d}',
-                'start_time': current_start,
-                'end_time': actual_end,
-                'duration': actual_end - current_start,
-                'caption_count': len(chunk_captions),
-                'overlap_with_next': {
-                    'start': overlap_start,
-                    'end': actual_end
-                } if overlap_start is not None else None
-            }
+        # Starts in [current_start, actual_end) form one slice of the sorted
+        # copy, whatever order the captions themselves are in
+        lo = bisect.bisect_left(sorted_starts, current_start)
+        hi = bisect.bisect_left(sorted_starts, actual_end)
 
-            chunks.append(metadata)
-            chunk_id += 1
+        if hi > lo:
+            yield current_start, actual_end, hi - lo
 
         if actual_end >= max_time:
             break
         current_start = actual_end - overlap_duration
 
+def chunk_with_overlap(captions, chunk_duration=9000, overlap_duration=1200):
+    """Chunk with overlap (from v2 script)"""
+    if not captions:
+        return []
+
+    max_time = captions[-1][1]
+
+    # Column views of the captions, built once for all chunks
+    starts = [s for s, _, _ in captions]
+    ends = [e for _, e, _ in captions]
+    pauses = [next_start - end for next_start, end in zip(starts[1:], ends)]
+
+    chunks = []
+    # Starts aren't guaranteed monotonic (the mock shifts some by 5s), so
+    # counting uses a sorted copy
+    bounds = _chunk_bounds(sorted(starts), ends, pauses, chunk_duration, overlap_duration)
+
+    for chunk_id, (start_time, end_time, caption_count) in enumerate(bounds):
+        overlap_start = max(0, end_time - overlap_duration) if end_time < max_time else None
+
+        chunks.append({
+            'chunk_id': f'chunk-{chunk_id:03d}',
+            'start_time': start_time,
+            'end_time': end_time,
+            'duration': end_time - start_time,
+            'caption_count': caption_count,
+            'overlap_with_next': {
+                'start': overlap_start,
+                'end': end_time
+            } if overlap_start is not None else None
+        })
+
     return chunks
 
 def test_chunking():
@@ -157,10 +179,11 @@ def test_cosine_similarity():
     d = [0.7, 0.7, 0]
 
     def cosine_similarity(a, b):
-        dot_product = sum(x * y for x, y in zip(a, b))
-        norm_a = math.sqrt(sum(x * x for x in a))
-        norm_b = math.sqrt(sum(y * y for y in b))
-        return dot_product / (norm_a * norm_b) if (norm_a * norm_b) > 0 else 0
+        # map/hypot keep the per-element loops in C, which matters for
+        # real 1536-dim embeddings
+        dot_product = sum(map(operator.mul, a, b))
+        norm = math.hypot(*a) * math.hypot(*b)
+        return dot_product / norm if norm > 0 else 0
 
     print(f"\n  Identical vectors: {cosine_similarity(a, b):.4f} (expected: 1.0)")
     print(f"  Orthogonal vectors: {cosine_similarity(a, c):.4f} (expected: 0.0)")
@@ -4,11 +4,23 @@ YouTube Transcript Extractor - Using youtube-transcript-api
 Fast, reliable transcript extraction without authentication
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import gzip
+import io
+import orjson
 import os
+import re
 import sys
-from youtube_transcript_api import YouTubeTranscriptApi
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from youtube_transcript_api._transcripts import TranscriptListFetcher
 from youtube_transcript_api._errors import (
     TranscriptsDisabled,
     NoTranscriptFound,
@@ -16,236 +28,651 @@ from youtube_transcript_api._errors import (
     TooManyRequests
 )
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+
+
+@dataclass(frozen=True)
+class R2Config:
+    """R2 connection settings, read once from the environment at startup"""
+    account_id: str
+    access_key_id: str
+    secret_access_key: str
+    bucket: str
+    endpoint: str
+
+
+def load_r2_config():
+    """Build the R2 config from the environment, or None if credentials are missing"""
+    account_id = os.environ.get('R2_ACCOUNT_ID')
+    access_key_id = os.environ.get('R2_ACCESS_KEY_ID')
+    secret_access_key = os.environ.get('R2_SECRET_ACCESS_KEY')
+
+    if not all([account_id, access_key_id, secret_access_key]):
+        return None
+
+    return R2Config(
+        account_id=account_id,
+        access_key_id=access_key_id,
+        secret_access_key=secret_access_key,
+        bucket=os.environ.get('R2_BUCKET_NAME') or 'capless-preview',
+        endpoint=f'https://{account_id}.r2.cloudflarestorage.com'
+    )
+
+
+R2 = load_r2_config()
+R2_ENABLED = R2 is not None
+if not R2_ENABLED:
+    print('WARNING: R2 credentials not configured - transcripts will not be uploaded')
+
+
+# Shared S3 client for R2, created on first use and reused across requests
+# so its connection pool keeps TLS connections to R2 alive
+_S3_CLIENT = None
+_S3_LOCK = threading.Lock()
+
+
+def get_s3_client():
+    """Return the shared R2 client, creating it on first call"""
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        with _S3_LOCK:
+            if _S3_CLIENT is None:
+                _S3_CLIENT = boto3.client(
+                    's3',
+                    endpoint_url=R2.endpoint,
+                    aws_access_key_id=R2.access_key_id,
+                    aws_secret_access_key=R2.secret_access_key,
+                    region_name='auto',
+                    # Short timeouts so a stalled R2 call frees its socket
+                    # quickly instead of holding it for the 60s default
+                    config=Config(
+                        connect_timeout=3,
+                        read_timeout=10,
+                        max_pool_connections=32,
+                        retries={'max_attempts': 3, 'mode': 'standard'},
+                        tcp_keepalive=True
+                    )
+                )
+    return _S3_CLIENT
+
+
+def reset_s3_client():
+    """Drop the shared R2 client after a connection failure; the next call rebuilds it
+
+    The old client is not closed explicitly since other threads may still be
+    using it; its pool is released once the last of them finishes.
+    """
+    global _S3_CLIENT
+    with _S3_LOCK:
+        _S3_CLIENT = None
+
+
+# Connection-level failures talking to R2: read timeouts and dropped
+# connections (HTTPClientError) as well as connect failures and connect
+# timeouts (botocore's ConnectionError)
+R2_CONNECTION_ERRORS = (HTTPClientError, BotoConnectionError)
+
+
+# Recent R2 HEAD results, (bucket, key) -> (checked_at, exists), so repeated
+# requests for the same date skip the round-trip to R2
+HEAD_CACHE_TTL = 300  # seconds
+HEAD_CACHE_SIZE = 1024
+_head_cache = OrderedDict()
+_HEAD_CACHE_LOCK = threading.Lock()
+
+
+def _store_head_result(key, checked_at, exists):
+    """Cache a HEAD result, evicting the least recently used entry when full"""
+    with _HEAD_CACHE_LOCK:
+        _head_cache[key] = (checked_at, exists)
+        _head_cache.move_to_end(key)
+        if len(_head_cache) > HEAD_CACHE_SIZE:
+            _head_cache.popitem(last=False)
+
+
+def r2_object_exists(s3_client, bucket, key):
+    """Return whether key exists in R2, reusing a recent HEAD result
+
+    Errors other than 404 are raised as ClientError and not cached.
+    """
+    now = time.monotonic()
+    with _HEAD_CACHE_LOCK:
+        entry = _head_cache.get((bucket, key))
+        if entry is not None:
+            if now - entry[0] < HEAD_CACHE_TTL:
+                _head_cache.move_to_end((bucket, key))
+                return entry[1]
+            del _head_cache[(bucket, key)]
+
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        exists = True
+    except ClientError as e:
+        if e.response['Error']['Code'] != '404':
+            raise
+        exists = False
+
+    _store_head_result((bucket, key), now, exists)
+    return exists
+
+
+def mark_r2_object_exists(bucket, key):
+    """Record a key just written to R2 so the next check sees it"""
+    _store_head_result((bucket, key), time.monotonic(), True)
+
+
+# YouTubeTranscriptApi.get_transcript opens a new requests.Session per call;
+# one shared session keeps TLS connections to youtube.com alive across requests
+_YT_SESSION = requests.Session()
+_YT_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+
+
+# Fetched transcripts are cached on local disk by video_id, so re-extracting a
+# video (e.g. for another date) skips the YouTube round-trip
+TRANSCRIPT_CACHE_DIR = Path('/tmp/yt-transcript-cache')
+TRANSCRIPT_CACHE_TTL = 7 * 86400  # seconds
+# Size cap for the whole cache directory, enforced by prune_transcript_cache
+TRANSCRIPT_CACHE_MAX_BYTES = 2 ** 30
+TRANSCRIPT_CACHE_PRUNE_INTERVAL = 600  # seconds
+_cache_last_prune = 0.0
+_CACHE_PRUNE_LOCK = threading.Lock()
+_VIDEO_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Videos that can never produce a transcript are remembered for an hour, so
+# retries answer from disk instead of asking YouTube again
+FAILURE_CACHE_TTL = 3600  # seconds
+PERMANENT_ERRORS = {
+    'TranscriptsDisabled': 'Transcripts disabled for this video',
+    'NoTranscriptFound': 'No English transcript found',
+    'VideoUnavailable': 'Video unavailable'
+}
+
+
+def transcript_cache_path(video_id, suffix):
+    """Cache file for video_id, or None if the ID isn't safe to use as a file name"""
+    if isinstance(video_id, str) and _VIDEO_ID_RE.fullmatch(video_id):
+        return TRANSCRIPT_CACHE_DIR / f'{video_id}{suffix}'
+    return None
+
+
+def read_cache_file(path, ttl):
+    """Return the bytes in path if it is younger than ttl; expired files are removed"""
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            return path.read_bytes()
+        path.unlink()
+    except OSError:
+        pass
+    return None
+
+
+def write_cache_file(path, data):
+    """Write data to path via a temp file so concurrent readers never see a partial file"""
+    try:
+        TRANSCRIPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f'⚠️  Transcript cache write failed: {str(e)}')
+    prune_transcript_cache()
+
+
+def prune_transcript_cache():
+    """Drop expired cache files, then the oldest ones until the cache fits its cap
+
+    Runs at most once per TRANSCRIPT_CACHE_PRUNE_INTERVAL, and never blocks a
+    request while another thread is already pruning.
+    """
+    global _cache_last_prune
+    if time.monotonic() - _cache_last_prune < TRANSCRIPT_CACHE_PRUNE_INTERVAL:
+        return
+    if not _CACHE_PRUNE_LOCK.acquire(blocking=False):
+        return
+    try:
+        _cache_last_prune = time.monotonic()
+        now = time.time()
+        entries = []
+        for entry in os.scandir(TRANSCRIPT_CACHE_DIR):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            ttl = FAILURE_CACHE_TTL if entry.name.endswith('.error') else TRANSCRIPT_CACHE_TTL
+            if now - st.st_mtime >= ttl:
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            else:
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+    except OSError as e:
+        print(f'⚠️  Transcript cache prune failed: {str(e)}')
+    finally:
+        _CACHE_PRUNE_LOCK.release()
+
+
+def get_cached_failure(video_id):
+    """Return the PERMANENT_ERRORS name recently recorded for video_id, if any"""
+    path = transcript_cache_path(video_id, '.error')
+    if path is None:
+        return None
+    data = read_cache_file(path, FAILURE_CACHE_TTL)
+    if data is not None:
+        error = data.decode('utf-8', 'replace')
+        if error in PERMANENT_ERRORS:
+            return error
+    return None
+
+
+def transcript_failure(video_id, error):
+    """Record a permanent failure for video_id and build its 404 response"""
+    path = transcript_cache_path(video_id, '.error')
+    if path is not None:
+        write_cache_file(path, error.encode())
+    return 404, {
+        'status': 'error',
+        'message': PERMANENT_ERRORS[error],
+        'video_id': video_id
+    }
+
+
+def get_transcript(video_id):
+    """Fetch the English transcript for video_id, using the disk cache when fresh"""
+    cache_path = transcript_cache_path(video_id, '.json')
+    if cache_path is not None:
+        data = read_cache_file(cache_path, TRANSCRIPT_CACHE_TTL)
+        if data is not None:
+            try:
+                transcript = orjson.loads(data)
+                print(f'💾 Transcript cache hit: {video_id}')
+                return transcript
+            except ValueError:
+                pass
+
+    # Get transcript (prefers manual, falls back to auto-generated). This is
+    # what YouTubeTranscriptApi.get_transcript does, but on the shared session
+    transcript = (
+        TranscriptListFetcher(_YT_SESSION)
+        .fetch(video_id)
+        .find_transcript(['en'])
+        .fetch()
+    )
+
+    if cache_path is not None:
+        write_cache_file(cache_path, orjson.dumps(transcript))
+
+    return transcript
 
 
 def convert_to_vtt(transcript):
     """Convert transcript JSON to VTT format"""
-    vtt_lines = ['WEBVTT\n']
+    # One growable buffer and one write per cue instead of four small strings
+    buf = io.StringIO()
+    buf.write('WEBVTT\n')
+
+    # Bound once so the loop doesn't re-resolve them for every cue
+    write = buf.write
+    _divmod = divmod
+    _round = round
 
-    for i, entry in enumerate(transcript):
+    for i, entry in enumerate(transcript, 1):
         start = entry['start']
-        duration = entry['duration']
-        end = start + duration
+        end = start + entry['duration']
 
-        start_time = format_timestamp(start)
-        end_time = format_timestamp(end)
+        # HH:MM:SS.mmm from rounded integer milliseconds (truncating turns float
+        # noise like 1.001 * 1000 == 1000.9999... into .000) split with divmod
+        sh, sms = _divmod(_round(start * 1000), 3600000)
+        sm, sms = _divmod(sms, 60000)
+        ss, sms = _divmod(sms, 1000)
 
-        vtt_lines.append(f'\n{i + 1}')
-        vtt_lines.append(f'{start_time} --> {end_time}')
-        vtt_lines.append(entry['text'])
+        eh, ems = _divmod(_round(end * 1000), 3600000)
+        em, ems = _divmod(ems, 60000)
+        es, ems = _divmod(ems, 1000)
 
-    return '\n'.join(vtt_lines)
+        write(
+            f'\n\n{i}\n{sh:02d}:{sm:02d}:{ss:02d}.{sms:03d} --> '
+            f'{eh:02d}:{em:02d}:{es:02d}.{ems:03d}\n{entry["text"]}'
+        )
 
+    return buf.getvalue()
 
-def format_timestamp(seconds):
-    """Format seconds to HH:MM:SS.mmm"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f'{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}'
 
+# Opt-in gzip storage. Existing readers fetch youtube/transcripts/{date}.vtt
+# as plain text, so compressed transcripts go to a separate .vtt.gz key
+COMPRESS_TRANSCRIPTS = os.environ.get('COMPRESS_TRANSCRIPTS') == '1'
 
-def upload_to_r2(vtt_content, date):
-    """Upload VTT content to R2"""
-    try:
-        account_id = os.environ.get('R2_ACCOUNT_ID')
-        access_key_id = os.environ.get('R2_ACCESS_KEY_ID')
-        secret_access_key = os.environ.get('R2_SECRET_ACCESS_KEY')
-        bucket_name = os.environ.get('R2_BUCKET_NAME', 'capless-preview')
 
-        if not all([account_id, access_key_id, secret_access_key]):
-            print('WARNING: R2 credentials not configured')
+def transcript_r2_key(date):
+    """R2 key for the transcript of the session on date"""
+    if COMPRESS_TRANSCRIPTS:
+        return f'youtube/transcripts/{date}.vtt.gz'
+    return f'youtube/transcripts/{date}.vtt'
+
+
+def upload_to_r2(vtt_bytes, date):
+    """Upload UTF-8 encoded VTT content to R2"""
+    try:
+        if not R2_ENABLED:
             return None
 
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=f'https://{account_id}.r2.cloudflarestorage.com',
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
-            region_name='auto'
-        )
+        s3_client = get_s3_client()
+
+        r2_key = transcript_r2_key(date)
+        extra_args = {'ContentType': 'text/vtt'}
+        if COMPRESS_TRANSCRIPTS:
+            vtt_bytes = gzip.compress(vtt_bytes, compresslevel=6)
+            extra_args['ContentEncoding'] = 'gzip'
 
-        r2_key = f'youtube/transcripts/{date}.vtt'
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=r2_key,
-            Body=vtt_content.encode('utf-8'),
-            ContentType='text/vtt'
+        # The transfer manager switches to a multipart upload for large transcripts
+        s3_client.upload_fileobj(
+            io.BytesIO(vtt_bytes),
+            R2.bucket,
+            r2_key,
+            ExtraArgs=extra_args
         )
+        mark_r2_object_exists(R2.bucket, r2_key)
 
         print(f'✅ Uploaded to R2: {r2_key}')
         return r2_key
 
+    except R2_CONNECTION_ERRORS as e:
+        print(f'❌ R2 upload connection error: {str(e)}')
+        reset_s3_client()
+        return None
+
     except Exception as e:
         print(f'❌ R2 upload error: {str(e)}')
         return None
 
 
+def extract_transcript(video_id, date):
+    """Extract one video's transcript and upload it to R2
+
+    Returns (http_status, response). Unexpected errors are raised.
+    """
+    print(f'🎬 Extracting transcript: {video_id} ({date})')
+
+    # Check if transcript already exists in R2 before extraction
+    if R2_ENABLED:
+        try:
+            s3_client = get_s3_client()
+
+            r2_key = transcript_r2_key(date)
+            if r2_object_exists(s3_client, R2.bucket, r2_key):
+                # File exists - return early
+                print(f'✅ Transcript already exists in R2: {r2_key}')
+                return 200, {
+                    'status': 'exists',
+                    'video_id': video_id,
+                    'date': date,
+                    'r2_key': r2_key,
+                    'message': 'Transcript already extracted'
+                }
+
+            print(f'📝 Transcript not found in R2, proceeding with extraction')
+
+        except ClientError as e:
+            print(f'⚠️  R2 check error: {str(e)}, proceeding anyway')
+
+        except R2_CONNECTION_ERRORS as e:
+            print(f'⚠️  R2 connection error: {str(e)}, proceeding anyway')
+            reset_s3_client()
+
+    cached_error = get_cached_failure(video_id)
+    if cached_error is not None:
+        print(f'💾 Cached failure for {video_id}: {cached_error}')
+        return 404, {
+            'status': 'error',
+            'message': PERMANENT_ERRORS[cached_error],
+            'video_id': video_id
+        }
+
+    try:
+        transcript = get_transcript(video_id)
+        print(f'📝 Found {len(transcript)} entries')
+
+        if not R2_ENABLED:
+            # Nowhere to upload - don't build a VTT only to throw it away
+            return 200, {
+                'status': 'success',
+                'video_id': video_id,
+                'date': date,
+                'transcript_length': None,
+                'transcript_entries': len(transcript),
+                'transcript_path': transcript_r2_key(date),
+                'uploaded_to_r2': False
+            }
+
+        # Convert to VTT, encoded once for both the upload and the size
+        vtt_bytes = convert_to_vtt(transcript).encode('utf-8')
+        print(f'📄 VTT size: {len(vtt_bytes)} bytes')
+
+        # Upload to R2
+        r2_key = upload_to_r2(vtt_bytes, date)
+
+        return 200, {
+            'status': 'success',
+            'video_id': video_id,
+            'date': date,
+            'transcript_length': len(vtt_bytes),
+            'transcript_entries': len(transcript),
+            'transcript_path': r2_key if r2_key else transcript_r2_key(date),
+            'uploaded_to_r2': r2_key is not None
+        }
+
+    except TranscriptsDisabled:
+        return transcript_failure(video_id, 'TranscriptsDisabled')
+
+    except NoTranscriptFound:
+        return transcript_failure(video_id, 'NoTranscriptFound')
+
+    except VideoUnavailable:
+        return transcript_failure(video_id, 'VideoUnavailable')
+
+    except TooManyRequests:
+        return 429, {
+            'status': 'error',
+            'message': 'Rate limited. Try again later.',
+            'video_id': video_id
+        }
+
+
+def extract_batch_item(item):
+    """Run extract_transcript for one batch entry, reporting failures in its result"""
+    video_id = item.get('video_id') if isinstance(item, dict) else None
+    date = item.get('date') if isinstance(item, dict) else None
+
+    if not video_id or not date:
+        status, response = 400, {'status': 'error', 'message': 'Missing video_id or date'}
+    else:
+        try:
+            status, response = extract_transcript(video_id, date)
+        except Exception as e:
+            print(f'❌ Error extracting {video_id}: {str(e)}')
+            status, response = 500, {'status': 'error', 'message': str(e), 'video_id': video_id}
+
+    response['http_status'] = status
+    return response
+
+
+# Request bodies are small JSON objects; anything past this is rejected
+MAX_BODY_SIZE = 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+
+# /extract_batch fans videos out over this pool so their YouTube fetches and
+# R2 uploads overlap instead of running one after another
+MAX_BATCH_SIZE = 50
+_BATCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='batch')
+
+# HEADs are cheap, so a batch checks all its keys at once on a wider pool
+# (matching the R2 client's connection pool) before extraction starts
+_HEAD_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix='r2-head')
+
+
+def prefetch_r2_exists(videos):
+    """Warm the HEAD cache for every date in a batch with concurrent checks"""
+    if not R2_ENABLED:
+        return
+
+    keys = {transcript_r2_key(item['date']) for item in videos
+            if isinstance(item, dict) and item.get('date')}
+    s3_client = get_s3_client()
+
+    def check(key):
+        # Errors are left uncached; the per-video check reports them
+        try:
+            r2_object_exists(s3_client, R2.bucket, key)
+        except R2_CONNECTION_ERRORS as e:
+            print(f'⚠️  R2 connection error checking {key}: {str(e)}')
+            reset_s3_client()
+        except (ClientError, BotoCoreError) as e:
+            print(f'⚠️  R2 check error for {key}: {str(e)}')
+
+    list(_HEAD_POOL.map(check, keys))
+
+
 class TranscriptHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests; every response
+    # therefore sets Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Socket timeout so an idle keep-alive connection frees its handler thread
+    timeout = 60  # seconds
+
     def log_message(self, format, *args):
         sys.stderr.write(f"[{self.log_date_time_string()}] {format % args}\n")
 
+    def _send_json(self, status, response):
+        """Encode response once and send it with an explicit Content-Length"""
+        body = orjson.dumps(response)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_not_found(self, close=False):
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        if close:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+
     def do_GET(self):
         if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
             response = {
                 'status': 'healthy',
                 'service': 'youtube-transcript-extractor',
                 'version': '2.0.0',
                 'method': 'youtube-transcript-api (no auth required)'
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(200, response)
         else:
-            self.send_response(404)
-            self.end_headers()
+            self._send_not_found()
 
     def do_POST(self):
-        if self.path != '/extract':
-            self.send_response(404)
-            self.end_headers()
+        if self.path not in ('/extract', '/extract_batch'):
+            # The unread request body would corrupt the next request on this connection
+            self._send_not_found(close=True)
             return
 
         try:
-            content_length = int(self.headers['Content-Length'])
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode('utf-8'))
-
-            video_id = data.get('video_id')
-            date = data.get('date')
-
-            if not video_id or not date:
-                self.send_error(400, 'Missing video_id or date')
+            # send_error closes the connection, so an unread body can't leak
+            # into the next request
+            try:
+                content_length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                self.send_error(400, 'Invalid Content-Length')
+                return
+            if content_length < 0:
+                # rfile.read(-n) would read until EOF and block on a keep-alive connection
+                self.send_error(400, 'Invalid Content-Length')
+                return
+            if not content_length:
+                self.send_error(400, 'Empty request body')
+                return
+            if content_length > MAX_BODY_SIZE:
+                self.send_error(413, 'Request body too large')
                 return
 
-            print(f'🎬 Extracting transcript: {video_id} ({date})')
-
-            # Check if transcript already exists in R2 before extraction
-            account_id = os.environ.get('R2_ACCOUNT_ID')
-            access_key_id = os.environ.get('R2_ACCESS_KEY_ID')
-            secret_access_key = os.environ.get('R2_SECRET_ACCESS_KEY')
-            bucket_name = os.environ.get('R2_BUCKET_NAME', 'capless-preview')
-
-            if all([account_id, access_key_id, secret_access_key]):
-                try:
-                    s3_client = boto3.client(
-                        's3',
-                        endpoint_url=f'https://{account_id}.r2.cloudflarestorage.com',
-                        aws_access_key_id=access_key_id,
-                        aws_secret_access_key=secret_access_key,
-                        region_name='auto'
-                    )
+            # Read in bounded chunks rather than one large read
+            buf = io.BytesIO()
+            remaining = content_length
+            while remaining:
+                chunk = self.rfile.read(min(BODY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                buf.write(chunk)
+                remaining -= len(chunk)
+            try:
+                data = orjson.loads(buf.getvalue())
+            except orjson.JSONDecodeError:
+                self.send_error(400, 'Invalid JSON body')
+                return
 
-                    r2_key = f'youtube/transcripts/{date}.vtt'
-                    s3_client.head_object(Bucket=bucket_name, Key=r2_key)
-
-                    # File exists - return early
-                    print(f'✅ Transcript already exists in R2: {r2_key}')
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'application/json')
-                    self.end_headers()
-                    response = {
-                        'status': 'exists',
-                        'video_id': video_id,
-                        'date': date,
-                        'r2_key': r2_key,
-                        'message': 'Transcript already extracted'
-                    }
-                    self.wfile.write(json.dumps(response).encode())
+            if self.path == '/extract_batch':
+                videos = data.get('videos')
+                if not isinstance(videos, list) or not videos:
+                    self.send_error(400, 'Missing videos list')
+                    return
+                if len(videos) > MAX_BATCH_SIZE:
+                    self.send_error(400, f'At most {MAX_BATCH_SIZE} videos per batch')
                     return
 
-                except ClientError as e:
-                    if e.response['Error']['Code'] == '404':
-                        print(f'📝 Transcript not found in R2, proceeding with extraction')
-                    else:
-                        print(f'⚠️  R2 check error: {str(e)}, proceeding anyway')
+                prefetch_r2_exists(videos)
+                results = list(_BATCH_POOL.map(extract_batch_item, videos))
+                status = 200
+                response = {
+                    'status': 'success',
+                    'results': results
+                }
+            else:
+                video_id = data.get('video_id')
+                date = data.get('date')
 
-            try:
-                # Get transcript (prefers manual, falls back to auto-generated)
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
-                print(f'📝 Found {len(transcript)} entries')
+                if not video_id or not date:
+                    self.send_error(400, 'Missing video_id or date')
+                    return
 
-                # Convert to VTT
-                vtt_content = convert_to_vtt(transcript)
-                print(f'📄 VTT size: {len(vtt_content)} bytes')
+                status, response = extract_transcript(video_id, date)
 
-                # Upload to R2
-                r2_key = upload_to_r2(vtt_content, date)
+            self._send_json(status, response)
 
-                # Success response
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                response = {
-                    'status': 'success',
-                    'video_id': video_id,
-                    'date': date,
-                    'transcript_length': len(vtt_content),
-                    'transcript_entries': len(transcript),
-                    'transcript_path': r2_key if r2_key else f'youtube/transcripts/{date}.vtt',
-                    'uploaded_to_r2': r2_key is not None
-                }
-                self.wfile.write(json.dumps(response).encode())
-
-            except TranscriptsDisabled:
-                self.send_response(404)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'status': 'error',
-                    'message': 'Transcripts disabled for this video',
-                    'video_id': video_id
-                }).encode())
-
-            except NoTranscriptFound:
-                self.send_response(404)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'status': 'error',
-                    'message': 'No English transcript found',
-                    'video_id': video_id
-                }).encode())
-
-            except VideoUnavailable:
-                self.send_response(404)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'status': 'error',
-                    'message': 'Video unavailable',
-                    'video_id': video_id
-                }).encode())
-
-            except TooManyRequests:
-                self.send_response(429)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'status': 'error',
-                    'message': 'Rate limited. Try again later.',
-                    'video_id': video_id
-                }).encode())
+        except TimeoutError:
+            # Socket timeout reading the body: handle_one_request logs it and
+            # closes the half-read connection
+            raise
 
         except Exception as e:
             print(f'❌ Error: {str(e)}')
             import traceback
             traceback.print_exc()
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, {
                 'status': 'error',
                 'message': str(e)
-            }).encode())
+            })
 
 
 def run_server(port=8080):
     server_address = ('', port)
-    httpd = HTTPServer(server_address, TranscriptHandler)
+    # One thread per request so a slow YouTube fetch doesn't block other requests
+    httpd = ThreadingHTTPServer(server_address, TranscriptHandler)
     print(f'🚀 YouTube Transcript Extractor v2.0 running on port {port}')
     print('📚 Using youtube-transcript-api (fast, no auth required)')
     print('✅ Ready to process requests...')